@@ -1,18 +1,18 @@
 import logging
+from functools import lru_cache
 
 import numpy as np
-from scipy.signal import medfilt2d, find_peaks
-from skimage.measure import label
-from skimage.morphology import closing, disk
+from scipy.signal import find_peaks
+from skimage.measure import label, regionprops
+from skimage.morphology import disk
 
-from math import floor
-
-import multiprocessing as mp
-from itertools import repeat as irepeat
+from math import hypot
 
 from bmlab import Session
-from bmlab.fits import fit_vipa, VIPA, fit_lorentz_region
-from bmlab.image import extract_lines_along_arc, find_max_in_radius
+from bmlab.fits import fit_vipa, VIPA, fit_lorentz_peaks, slice_region
+from bmlab.image import extract_lines_along_arc, find_max_in_radius, \
+    binary_closing, median_filter_3x3
+from bmlab.utils import nanmean
 from bmlab.export import FluorescenceExport, \
     FluorescenceCombinedExport, BrillouinExport
 
@@ -20,6 +20,28 @@ import warnings
 
 logger = logging.getLogger(__name__)
 
+# Extent of the regions around the peaks found
+# by the calibration in multiples of the peak width
+_PEAK_REGION_EXTENT = np.array((-4, 4))
+
+# The FWHM limits for the named bound settings
+_FWHM_LIMITS = {'min': 0, '-inf': 0, 'max': np.inf, 'inf': np.inf}
+
+# Labels of the spatial axes of the evaluated data
+_AXIS_LABELS = (r'$x$ [$\mu$m]', r'$y$ [$\mu$m]', r'$z$ [$\mu$m]')
+
+
+@lru_cache(maxsize=16)
+def _disk(radius):
+    """
+    Returns the disk-shaped footprint of the given radius.
+    The footprint only depends on the binning factor,
+    so we cache it for all calibrations.
+    """
+    footprint = disk(radius)
+    footprint.flags.writeable = False
+    return footprint
+
 
 class ExtractionController(object):
 
@@ -47,8 +69,8 @@ class ExtractionController(object):
         imgs = self.session.get_calibration_image(calib_key)
         if imgs is None:
             return
-        img = np.nanmean(imgs, axis=0)
-        img = medfilt2d(img)
+        img = nanmean(imgs, axis=0)
+        img = median_filter_3x3(img)
 
         points = em.get_points(calib_key)
         time = em.get_time(calib_key)
@@ -76,7 +98,7 @@ class ExtractionController(object):
         imgs = self.session.get_calibration_image(calib_key)
         if imgs is None:
             return
-        img = np.nanmean(imgs, axis=0)
+        img = nanmean(imgs, axis=0)
         time = self.session.get_calibration_time(calib_key)
         if time is None:
             return
@@ -89,7 +111,7 @@ class ExtractionController(object):
             disc_size = disc_size / binning
             min_area = min_area / (binning**2)
 
-        img = medfilt2d(img)
+        img = median_filter_3x3(img)
         # This is the background level
         threshold = np.median(img)
 
@@ -99,43 +121,49 @@ class ExtractionController(object):
         # plus a minimal peak height
         img_peaks = img[img > threshold + min_height]
         # Calculate the signal dependent peak threshold
-        height = (np.nanmean(img_peaks) + threshold) / 2
-        img_closed = closing(img > height, disk(disc_size))
+        height = (nanmean(img_peaks) + threshold) / 2
+        img_closed = binary_closing(img > height, _disk(disc_size))
 
         # Find all peaks higher than the min_height
-        image_label, num = label(img_closed, return_num=True)
+        image_label = label(img_closed)
 
+        # Get the area and the position of the maximum of all regions.
+        # regionprops only visits the bounding box of every region and
+        # returns the coordinates in raster order, so np.argmax gives
+        # the same position as for the full masked image.
         all_peaks = []
-        for region in range(1, num + 1):
-            # Mask of everything but the peak
-            mask = (image_label != region)
-            # Set everything but the peak to zero
-            tmp = img.copy()
-            tmp[mask] = 0
-
+        for region in regionprops(image_label):
             # Discard all peaks with an area that is too small
-            if np.sum(np.logical_not(mask)) >= min_area:
-                # Find indices of peak maximum
-                ind = np.unravel_index(np.argmax(tmp, axis=None), tmp.shape)
-
-                all_peaks.append(ind)
+            if region.area < min_area:
+                continue
+            coords = region.coords
+            idx = np.argmax(img[coords[:, 0], coords[:, 1]])
+            all_peaks.append((int(coords[idx, 0]), int(coords[idx, 1])))
 
         # Filter found peaks
         p0 = (0, img.shape[1])
         p1 = (img.shape[0], 0)
-        peaks = filter(
-            lambda peak:
-            self.distance_point_to_line(peak, p0, p1) < max_distance,
-            all_peaks)
+        distances = self.distance_point_to_line(
+            np.reshape(all_peaks, (-1, 2)), p0, p1)
+        peaks = [peak for peak, distance in zip(all_peaks, distances)
+                 if distance < max_distance]
 
         # Add found peaks to model
-        em.set_points(calib_key, time, list(peaks))
+        em.set_points(calib_key, time, peaks)
 
-    def distance_point_to_line(self, point, line0, line1):
-        return abs(
-            (line1[1] - line0[1]) * (line0[0] - point[0]) -
-            (line0[1] - point[1]) * (line1[0] - line0[0]))\
-               / np.sqrt((line1[1] - line0[1])**2 + (line1[0] - line0[0])**2)
+    @staticmethod
+    def distance_point_to_line(point, line0, line1):
+        """
+        Returns the distance of a point to the line through
+        line0 and line1. The point can also be an array of
+        points with the coordinates along the last axis.
+        """
+        dx = line1[0] - line0[0]
+        dy = line1[1] - line0[1]
+        # Unit normal vector and offset of the line
+        normal = np.array((dy, -dx)) / hypot(dx, dy)
+        offset = normal @ line0
+        return np.abs(np.asarray(point) @ normal - offset)
 
 
 class ImageController(object):
@@ -161,18 +189,12 @@ class ImageController(object):
             imgs = imgs[frame_num:frame_num+1]
 
         # Extract values from *all* frames in the current calibration
-        spectra = []
-        for img in imgs:
-            values_by_img = extract_lines_along_arc(
-                img,
-                arc
-            )
-            spectra.append(values_by_img)
+        spectra = list(extract_lines_along_arc(imgs, arc))
 
         exposure = self.get_exposure(image_key)
         times = exposure * np.arange(len(imgs)) + time
 
-        intensities = np.nanmean(imgs, axis=(1, 2))
+        intensities = nanmean(imgs, axis=(1, 2))
 
         # We only set the spectra if we extracted all
         if frame_num is None:
@@ -199,7 +221,8 @@ class CalibrationController(ImageController):
             return
         spectrum = np.mean(spectra, axis=0)
         # This is the background value
-        base = np.nanmedian(spectrum)
+        # (NaNs only occur at the edges, so we mask them once)
+        base = np.median(spectrum[np.isfinite(spectrum)])
         peaks, properties = find_peaks(
             spectrum, prominence=min_prominence, width=True,
             height=min_height+base)
@@ -228,16 +251,17 @@ class CalibrationController(ImageController):
             center = np.mean(peaks[idx - 1:idx + 1])
         # Otherwise we use the center of mass as the middle
         else:
-            # Set everything below the background value to zero,
-            # so it does not affect the center calculation
-            spectrum[spectrum < base] = 0
+            # Set everything below the background value (and NaNs)
+            # to zero, so it does not affect the center calculation
+            spectrum[~(spectrum >= base)] = 0
             # Calculate the center of mass
-            center = np.nansum(spectrum * range(1, len(spectrum) + 1))\
-                / np.nansum(spectrum)
+            center = spectrum @ np.arange(1, len(spectrum) + 1)\
+                / np.sum(spectrum)
 
             # Check that we have enough peaks on both sides of the center
-            num_peaks_right = len(peaks[peaks > center])
-            num_peaks_left = len(peaks[peaks <= center])
+            # (the peaks returned by find_peaks are sorted)
+            num_peaks_left = int(np.searchsorted(peaks, center, side='right'))
+            num_peaks_right = len(peaks) - num_peaks_left
 
             # If not enough peaks on the right, shift center to the left
             if num_peaks_right < (num_brillouin_samples + 1):
@@ -250,9 +274,9 @@ class CalibrationController(ImageController):
                     peaks[num_brillouin_samples:num_brillouin_samples + 2]
                 )
 
-        num_peaks_left = len(peaks[peaks <= center])
+        num_peaks_left = int(np.searchsorted(peaks, center, side='right'))
 
-        indices_brillouin = range(
+        indices_brillouin = np.arange(
             num_peaks_left - num_brillouin_samples,
             num_peaks_left + num_brillouin_samples
         )
@@ -261,15 +285,14 @@ class CalibrationController(ImageController):
             num_peaks_left + num_brillouin_samples
         ]
 
-        def peak_to_region(i):
-            r = (
-                        peaks[i]
-                        + properties['widths'][i] * np.array((-4, 4))
-                ).astype(int)
-            r[r > len(spectrum)] = len(spectrum)
-            return tuple(r)
+        # The regions extend four peak widths to both sides of the peaks
+        regions = (
+            peaks[:, np.newaxis]
+            + properties['widths'][:, np.newaxis] * _PEAK_REGION_EXTENT
+        ).astype(int)
+        regions[regions > len(spectrum)] = len(spectrum)
 
-        regions_brillouin = list(map(peak_to_region, indices_brillouin))
+        regions_brillouin = list(map(tuple, regions[indices_brillouin]))
         # Merge the Brillouin regions if necessary
         if num_brillouin_samples > 1:
             regions_brillouin = [
@@ -279,7 +302,7 @@ class CalibrationController(ImageController):
                  regions_brillouin[-1][1]),
             ]
 
-        regions_rayleigh = map(peak_to_region, indices_rayleigh)
+        regions_rayleigh = map(tuple, regions[indices_rayleigh])
 
         cm = self.session.calibration_model()
         # Add Brillouin regions
@@ -324,14 +347,14 @@ class CalibrationController(ImageController):
         if max_count is not None:
             max_count.value += len(spectra)
 
-        for frame_num, spectrum in enumerate(spectra):
+        xdata = np.arange(len(spectra[0]))
+        for frame_num in range(len(spectra)):
             peaks = cm.get_sorted_peaks(calib_key, frame_num)
 
             params = fit_vipa(peaks, setup)
             if params is None:
                 continue
             vipa_params.append(params)
-            xdata = np.arange(len(spectrum))
 
             frequencies.append(VIPA(xdata, params) - setup.f0)
             if count is not None:
@@ -364,11 +387,12 @@ class CalibrationController(ImageController):
         regions = cm.get_rayleigh_regions(calib_key)
 
         cm.clear_rayleigh_fits(calib_key)
-        for frame_num, spectrum in enumerate(spectra):
-            for region_key, region in enumerate(regions):
-                xdata = np.arange(len(spectrum))
-                w0, fwhm, intensity, offset = \
-                    fit_lorentz_region(region, xdata, spectrum)
+        if not spectra:
+            return
+        fits = self.fit_regions(spectra, regions)
+        for frame_num, frame_fits in enumerate(fits):
+            for region_key, (w0, fwhm, intensity, offset)\
+                    in enumerate(frame_fits):
                 cm.add_rayleigh_fit(calib_key, region_key, frame_num,
                                     w0, fwhm, intensity, offset)
 
@@ -381,19 +405,37 @@ class CalibrationController(ImageController):
             return
 
         cm.clear_brillouin_fits(calib_key)
-        for frame_num, spectrum in enumerate(spectra):
-            for region_key, region in enumerate(regions):
-                xdata = np.arange(len(spectrum))
-                w0s, fwhms, intensities, offset = \
-                    fit_lorentz_region(
-                        region,
-                        xdata,
-                        spectrum,
-                        setup.calibration.num_brillouin_samples
-                    )
+        if not spectra:
+            return
+        fits = self.fit_regions(spectra, regions,
+                                setup.calibration.num_brillouin_samples)
+        for frame_num, frame_fits in enumerate(fits):
+            for region_key, (w0s, fwhms, intensities, offset)\
+                    in enumerate(frame_fits):
                 cm.add_brillouin_fit(calib_key, region_key, frame_num,
                                      w0s, fwhms, intensities, offset)
 
+    def fit_regions(self, spectra, regions, nr_peaks=1):
+        """
+        Fits all regions of all spectra of a calibration
+        in parallel and returns the fits by frame and region.
+        """
+        # All spectra of a calibration have the same length
+        xdata = np.arange(len(spectra[0]))
+        # Every frame and region is fitted separately
+        tasks = []
+        for frame_num, spectrum in enumerate(spectra):
+            for region_key, region in enumerate(regions):
+                x, y = slice_region(region, xdata, spectrum)
+                tasks.append(((frame_num, region_key), ([x], [y], nr_peaks)))
+        fits = [[None] * len(regions) for _ in spectra]
+        pool_size = self.session.get_pool_size()
+        for (frame_num, region_key), task_fits in self.session.get_pool().map(
+                _fit_spectra_task, tasks,
+                chunksize=max(1, len(tasks) // (pool_size * 4))):
+            fits[frame_num][region_key] = task_fits[0]
+        return fits
+
     def expected_frequencies(self, calib_key=None, current_frame=None):
         cm = self.session.calibration_model()
 
@@ -515,75 +557,73 @@ class EvaluationController(ImageController):
             'nr_rayleigh_regions': len(rayleigh_regions),
         })
 
-        pool_size = mp.cpu_count() * 2
-        pool = mp.Pool(processes=pool_size)
+        pool = self.session.get_pool()
+        pool_size = self.session.get_pool_size()
         # Initialize the Rayleigh shift
         # used for compensating drifts
         rayleigh_peak_initial =\
             np.nan * np.ones((len(spectra), len(rayleigh_regions), 1))
-        # Loop over all measurement positions
-        for idx, image_key in enumerate(image_keys):
-
-            if count is not None:
-                count.value += 1
-
-            # Calculate the indices for the given key
-            (ind_x, ind_y, ind_z) =\
-                self.get_indices_from_key(resolution, image_key)
-
-            if (abort is not None) and abort.value:
-                calculate_derived_values()
-                if max_count is not None:
-                    max_count.value = -1
-                return
-            spectra, times, intensities =\
-                self.extract_spectra(image_key)
-            if spectra is None:
-                continue
-            evm.results['time'][ind_x, ind_y, ind_z, :, 0, 0] =\
-                times
-            evm.results['intensity'][ind_x, ind_y, ind_z, :, 0, 0] =\
-                intensities
-
-            frequencies = cm.get_frequencies_by_time(times)
-            # If we don't have frequency axis, we cannot evaluate on it
-            if frequencies is None:
-                continue
-            frequencies = list(frequencies)
-
-            # Pack the data for parallel processing
-            regions = brillouin_regions + rayleigh_regions
-            packed_data = zip(irepeat(spectra), irepeat(frequencies), regions)
+        regions = brillouin_regions + rayleigh_regions
+        # We process the measurement positions in batches
+        # and fit all regions of all positions in a batch at once,
+        # so the pool does not idle between positions
+        batch_size = pool_size
+        aborted = False
+        for batch_start in range(0, len(image_keys), batch_size):
+            positions = []
+            nr_visited = 0
+            for image_key in image_keys[batch_start:batch_start + batch_size]:
+                # On abort, we still fit the positions already extracted
+                if (abort is not None) and abort.value:
+                    aborted = True
+                    break
+                nr_visited += 1
+
+                # Calculate the indices for the given key
+                indices = self.get_indices_from_key(resolution, image_key)
+
+                spectra, times, intensities =\
+                    self.extract_spectra(image_key)
+                if spectra is None:
+                    continue
+                evm.results['time'][(*indices, slice(None), 0, 0)] =\
+                    times
+                evm.results['intensity'][(*indices, slice(None), 0, 0)] =\
+                    intensities
+
+                frequencies = cm.get_frequencies_by_time(times)
+                # If we don't have frequency axis, we cannot evaluate on it
+                if frequencies is None:
+                    continue
+                # Slice the data of all regions once,
+                # so we only send the relevant parts to the workers
+                region_data = [
+                    tuple(zip(*[slice_region(region, frequency, spectrum)
+                                for frequency, spectrum
+                                in zip(frequencies, spectra)]))
+                    for region in regions
+                ]
+                positions.append((indices, region_data))
+
+            # Pack the data for parallel processing,
+            # every region of every position is fitted separately
+            tasks = [
+                ((position_idx, region_key), region_data[region_key])
+                for position_idx, (_, region_data) in enumerate(positions)
+                for region_key in range(len(regions))
+            ]
             # Process it
-            results = pool.starmap(self.fit_spectra, packed_data)
-
-            # Unpack the results
-            for frame_num, spectrum in enumerate(spectra):
-                for region_key, _ in enumerate(brillouin_regions):
-                    ind = (ind_x, ind_y, ind_z,
-                           frame_num, region_key, 0)
-                    evm.results['brillouin_peak_position_f'][ind] =\
-                        results[region_key][frame_num][0]
-                    evm.results['brillouin_peak_fwhm_f'][ind] =\
-                        results[region_key][frame_num][1]
-                    evm.results['brillouin_peak_intensity'][ind] =\
-                        results[region_key][frame_num][2]
-                    evm.results['brillouin_peak_offset'][ind] =\
-                        results[region_key][frame_num][3]
-
-                for region_key, _ \
-                        in enumerate(rayleigh_regions,
-                                     start=len(brillouin_regions)):
-                    ind = (ind_x, ind_y, ind_z, frame_num,
-                           region_key - len(brillouin_regions))
-                    evm.results['rayleigh_peak_position_f'][ind] =\
-                        results[region_key][frame_num][0]
-                    evm.results['rayleigh_peak_fwhm_f'][ind] =\
-                        results[region_key][frame_num][1]
-                    evm.results['rayleigh_peak_intensity'][ind] =\
-                        results[region_key][frame_num][2]
-                    evm.results['rayleigh_peak_offset'][ind] =\
-                        results[region_key][frame_num][3]
+            for (position_idx, region_key), fits in pool.map(
+                    _fit_spectra_task, tasks,
+                    chunksize=max(1, len(tasks) // (pool_size * 4))):
+                indices = positions[position_idx][0]
+                if region_key < len(brillouin_regions):
+                    self.store_fits(evm, 'brillouin', indices,
+                                    region_key, 0, fits)
+                else:
+                    self.store_fits(evm, 'rayleigh', indices,
+                                    region_key - len(brillouin_regions),
+                                    0, fits)
 
             # We can only do a multi-peak fit after the single-peak
             # Rayleigh fit is done, because we have to know the
@@ -591,88 +631,64 @@ class EvaluationController(ImageController):
             # the multi-peak fit bounds given in GHz into the position
             # in pixels.
             if nr_brillouin_peaks > 1:
-                ind =\
-                    (ind_x, ind_y, ind_z, slice(None), slice(None), 0)
-                rayleigh_peaks = np.transpose(
-                    evm.results['rayleigh_peak_position_f'][ind]
-                )
-                bounds_w0 = self.create_bounds(
-                    brillouin_regions,
-                    rayleigh_peaks
-                )
-                bounds_fwhm = self.create_bounds_fwhm(
-                    brillouin_regions,
-                    rayleigh_peaks
-                )
-                if bounds_w0 is None and bounds_fwhm is None:
-                    packed_data_multi_peak =\
-                        zip(irepeat(spectra),
-                            irepeat(frequencies),
-                            brillouin_regions,
-                            irepeat(nr_brillouin_peaks),
-                            irepeat(bounds_w0),
-                            irepeat(bounds_fwhm))
-                elif bounds_fwhm is None:
-                    packed_data_multi_peak =\
-                        zip(irepeat(spectra),
-                            irepeat(frequencies),
-                            brillouin_regions,
-                            irepeat(nr_brillouin_peaks),
-                            bounds_w0,
-                            irepeat(bounds_fwhm))
-                else:
-                    packed_data_multi_peak =\
-                        zip(irepeat(spectra),
-                            irepeat(frequencies),
-                            brillouin_regions,
-                            irepeat(nr_brillouin_peaks),
-                            bounds_w0,
-                            bounds_fwhm)
+                tasks = []
+                for position_idx, (indices, region_data)\
+                        in enumerate(positions):
+                    rayleigh_peaks = np.transpose(
+                        evm.results['rayleigh_peak_position_f'][
+                            (*indices, slice(None), slice(None), 0)]
+                    )
+                    bounds_w0 = self.create_bounds(
+                        brillouin_regions,
+                        rayleigh_peaks
+                    )
+                    bounds_fwhm = self.create_bounds_fwhm(
+                        brillouin_regions,
+                        rayleigh_peaks
+                    )
+                    for region_key in range(len(brillouin_regions)):
+                        tasks.append((
+                            (position_idx, region_key),
+                            (*region_data[region_key],
+                             nr_brillouin_peaks,
+                             None if bounds_w0 is None
+                             else bounds_w0[region_key],
+                             None if bounds_fwhm is None
+                             else bounds_fwhm[region_key])
+                        ))
                 # Process it
-                results_multi_peak = pool.starmap(
-                    self.fit_spectra, packed_data_multi_peak)
-
-                for frame_num, spectrum in enumerate(spectra):
-                    for region_key, _ in enumerate(
-                            brillouin_regions):
-                        ind = (ind_x, ind_y, ind_z,
-                               frame_num, region_key,
-                               slice(1, nr_brillouin_peaks+1))
-                        evm.results[
-                            'brillouin_peak_position_f'][ind] = \
-                            results_multi_peak[
-                                region_key][frame_num][0]
-                        evm.results[
-                            'brillouin_peak_fwhm_f'][ind] = \
-                            results_multi_peak[
-                                region_key][frame_num][1]
-                        evm.results[
-                            'brillouin_peak_intensity'][ind] = \
-                            results_multi_peak[
-                                region_key][frame_num][2]
-                        evm.results[
-                            'brillouin_peak_offset'][ind] = \
-                            results_multi_peak[
-                                region_key][frame_num][3]
-
-            # Calculate the shift of the Rayleigh peaks,
-            # in order to follow the peaks in case of a drift
-            rayleigh_peak_current = evm.results['rayleigh_peak_position_f'][
-                    ind_x, ind_y, ind_z, :, :, :]
-            # If we haven't found a valid Rayleigh peak position,
-            # but the current one is valid, use it
-            if not np.isnan(rayleigh_peak_current).all()\
-                    and np.isnan(rayleigh_peak_initial).all():
-                rayleigh_peak_initial = rayleigh_peak_current
-            shift = rayleigh_peak_current - rayleigh_peak_initial
-            evm.results['rayleigh_shift'][ind_x, ind_y, ind_z, :, :, :] = shift
-
-            # Calculate the derived values every ten steps
-            if not (idx % 10):
-                calculate_derived_values()
-
-        pool.close()
-        pool.join()
+                for (position_idx, region_key), fits in pool.map(
+                        _fit_spectra_task, tasks,
+                        chunksize=max(1, len(tasks) // (pool_size * 4))):
+                    self.store_fits(evm, 'brillouin',
+                                    positions[position_idx][0], region_key,
+                                    slice(1, nr_brillouin_peaks + 1), fits)
+
+            for indices, _ in positions:
+                # Calculate the shift of the Rayleigh peaks,
+                # in order to follow the peaks in case of a drift
+                rayleigh_peak_current =\
+                    evm.results['rayleigh_peak_position_f'][indices]
+                # If we haven't found a valid Rayleigh peak position,
+                # but the current one is valid, use it
+                if not np.isnan(rayleigh_peak_current).all()\
+                        and np.isnan(rayleigh_peak_initial).all():
+                    rayleigh_peak_initial = rayleigh_peak_current
+                shift = rayleigh_peak_current - rayleigh_peak_initial
+                evm.results['rayleigh_shift'][indices] = shift
+
+            # Calculate the derived values after every batch
+            calculate_derived_values()
+
+            # The positions of this batch are done now
+            if count is not None:
+                count.value += nr_visited
+
+            if aborted:
+                if max_count is not None:
+                    max_count.value = -1
+                return
+
         calculate_derived_values()
 
         return
@@ -680,35 +696,62 @@ class EvaluationController(ImageController):
     @staticmethod
     def fit_spectra(spectra, frequencies, region, nr_peaks=1,
                     bounds_w0=None, bounds_fwhm=None):
+        xdata, ydata = zip(*[
+            slice_region(region, frequency, spectrum)
+            for frequency, spectrum in zip(frequencies, spectra)
+        ])
+        return EvaluationController.fit_sliced_spectra(
+            xdata, ydata, nr_peaks, bounds_w0, bounds_fwhm)
+
+    @staticmethod
+    def fit_sliced_spectra(xdata, ydata, nr_peaks=1,
+                           bounds_w0=None, bounds_fwhm=None):
+        """
+        Fits the spectra of all frames, which are
+        already sliced to the region to fit.
+        """
         fits = []
-        for frame_num, spectrum in enumerate(spectra):
-            if bounds_w0 is None and bounds_fwhm is None:
-                fit = fit_lorentz_region(
-                    region,
-                    frequencies[frame_num],
-                    spectrum,
-                    nr_peaks
-                )
-            elif bounds_fwhm is None:
-                fit = fit_lorentz_region(
-                    region,
-                    frequencies[frame_num],
-                    spectrum,
-                    nr_peaks,
-                    bounds_w0[frame_num]
-                )
-            else:
-                fit = fit_lorentz_region(
-                    region,
-                    frequencies[frame_num],
-                    spectrum,
-                    nr_peaks,
-                    bounds_w0[frame_num],
-                    bounds_fwhm[frame_num]
-                )
+        for frame_num, (x, y) in enumerate(zip(xdata, ydata)):
+            fit = fit_lorentz_peaks(
+                x,
+                y,
+                nr_peaks,
+                None if bounds_w0 is None else bounds_w0[frame_num],
+                None if bounds_fwhm is None else bounds_fwhm[frame_num]
+            )
             fits.append(fit)
         return fits
 
+    @staticmethod
+    def store_fits(evm, peak_type, indices, region_key, peak_index, fits):
+        """
+        Stores the fits of all frames of a region
+        at a measurement position in the results arrays
+
+        Parameters
+        ----------
+        evm: EvaluationModel
+            The model to store the fits in
+        peak_type: str
+            Either 'brillouin' or 'rayleigh'
+        indices: tuple
+            The (x, y, z) indices of the measurement position
+        region_key: int
+            The index of the region
+        peak_index: int or slice
+            The peak index (or indices in case of a multi-peak fit)
+        fits: list
+            The fits for every frame as returned by fit_spectra
+        """
+        keys = [peak_type + '_peak_position_f',
+                peak_type + '_peak_fwhm_f',
+                peak_type + '_peak_intensity',
+                peak_type + '_peak_offset']
+        for frame_num, fit in enumerate(fits):
+            ind = (*indices, frame_num, region_key, peak_index)
+            for key, value in zip(keys, fit):
+                evm.results[key][ind] = value
+
     def create_bounds(self, brillouin_regions, rayleigh_peaks):
         """
         This function converts the bounds settings into
@@ -716,7 +759,7 @@ class EvaluationController(ImageController):
         Allowed parameters for the bounds settings are
         - 'min'/'max'   -> Will be converted to the respective
             lower or upper limit of the given region
-        - '-Inf', 'Inf' -> Will be converted to -np.Inf or np.Inf
+        - '-Inf', 'Inf' -> Will be converted to -np.inf or np.inf
         - number [GHz]  -> Will be converted into the pixel
             position of the given frequency
         Parameters
@@ -738,6 +781,30 @@ class EvaluationController(ImageController):
         if rayleigh_peaks.shape[0] != 2:
             return None
 
+        # The parsed limits and whether a bound belongs to an
+        # Anti-Stokes peak don't depend on the region,
+        # so we only determine them once
+        limits = [[limit.lower() for limit in bound] for bound in bounds]
+        is_anti_stokes_peaks = []
+        for bound in bounds:
+            parsed_bound = []
+            for limit in bound:
+                try:
+                    parsed_bound.append(float(limit))
+                except ValueError:
+                    parsed_bound.append(np.nan)
+            # We don't treat Inf as a value
+            with warnings.catch_warnings():
+                warnings.filterwarnings(
+                    action='ignore',
+                    message='Mean of empty slice'
+                )
+                is_anti_stokes_peaks.append(
+                    np.nanmean(
+                        np.array(parsed_bound)[np.isfinite(parsed_bound)]
+                    ) < 0
+                )
+
         w0_bounds = []
         # We have to create a separate bound for every region
         for region_idx, region in enumerate(brillouin_regions):
@@ -754,41 +821,23 @@ class EvaluationController(ImageController):
                     anti_stokes_limit
 
                 local_bound = []
-                for bound in bounds:
-                    parsed_bound = []
-                    for limit in bound:
-                        try:
-                            parsed_bound.append(float(limit))
-                        except ValueError:
-                            parsed_bound.append(np.NaN)
-                    # We don't treat Inf as a value
-                    with warnings.catch_warnings():
-                        warnings.filterwarnings(
-                            action='ignore',
-                            message='Mean of empty slice'
-                        )
-                        is_anti_stokes_peak =\
-                            np.nanmean(
-                                np.array(parsed_bound)[
-                                    np.isfinite(parsed_bound)]
-                            ) < 0
-
+                for bound, is_anti_stokes_peak\
+                        in zip(limits, is_anti_stokes_peaks):
                     is_anti_stokes = is_anti_stokes_region if\
                         is_pure_region else is_anti_stokes_peak
 
                     local_limit = []
                     for limit in bound:
-                        if limit.lower() == 'min':
+                        if limit == 'min':
                             val = region[int(is_anti_stokes)]
-                            # print(val)
-                        elif limit.lower() == 'max':
+                        elif limit == 'max':
                             val = region[int(not is_anti_stokes)]
-                        elif limit.lower() == '-inf':
+                        elif limit == '-inf':
                             val = -((-1) ** is_anti_stokes)\
-                                          * np.Inf
-                        elif limit.lower() == 'inf':
+                                          * np.inf
+                        elif limit == 'inf':
                             val = ((-1) ** is_anti_stokes)\
-                                          * np.Inf
+                                          * np.inf
                         else:
                             # Try to convert the value in GHz into
                             # a value in pixel depending on the time
@@ -798,7 +847,7 @@ class EvaluationController(ImageController):
                                           + rayleigh_peaks[
                                           int(is_anti_stokes), rayleigh_idx]
                             except BaseException:
-                                val = np.Inf
+                                val = np.inf
                         local_limit.append(val)
                     # Check that the bounds are sorted ascendingly
                     # (for anti-stokes, they might not).
@@ -814,8 +863,8 @@ class EvaluationController(ImageController):
         This function converts the fwhm bounds settings into
         a fwhm bounds object for the fitting function
         Allowed parameters for the bounds settings are
-        - 'min'/'max'   -> Will be converted to 0/np.Inf
-        - '-Inf', 'Inf' -> Will be converted to 0 or np.Inf
+        - 'min'/'max'   -> Will be converted to 0/np.inf
+        - '-Inf', 'Inf' -> Will be converted to 0 or np.inf
         - number [GHz]  -> Will be converted into the value in Hz
         Parameters
         ----------
@@ -831,32 +880,14 @@ class EvaluationController(ImageController):
         if bounds_fwhm is None:
             return None
 
-        fwhm_bounds = []
-        # We have to create a separate bound for every region
-        for region_idx, _ in enumerate(brillouin_regions):
-            region_bound = []
-            for rayleigh_idx in range(rayleigh_peaks.shape[1]):
-                peak_bound = []
-                for bound in bounds_fwhm:
-                    local_bound = []
-                    for limit in bound:
-                        if limit.lower() == 'min':
-                            val = 0
-                        elif limit.lower() == '-inf':
-                            val = 0
-                        elif limit.lower() == 'max':
-                            val = np.Inf
-                        elif limit.lower() == 'inf':
-                            val = np.Inf
-                        else:
-                            try:
-                                val = 1e9*abs(float(limit))
-                            except ValueError:
-                                val = np.Inf
-                        local_bound.append(val)
-                    peak_bound.append(local_bound)
-                region_bound.append(peak_bound)
-            fwhm_bounds.append(region_bound)
+        # The FWHM bounds don't depend on the region or the Rayleigh peaks,
+        # so we only parse them once and repeat them for every combination
+        parsed = np.array([[_parse_fwhm_limit(limit) for limit in bound]
+                           for bound in bounds_fwhm], dtype=float)
+        fwhm_bounds = np.broadcast_to(
+            parsed,
+            (len(brillouin_regions), rayleigh_peaks.shape[1], *parsed.shape)
+        ).copy()
         return fwhm_bounds
 
     def get_data(self, parameter_key, brillouin_peak_index=0):
@@ -896,8 +927,7 @@ class EvaluationController(ImageController):
         pos = self.session.get_payload_positions()
 
         positions = list(pos.values())
-        labels = list(map(lambda axis_label:
-                          r'$' + axis_label + '$ [$\\mu$m]', ['x', 'y', 'z']))
+        labels = list(_AXIS_LABELS)
 
         evm = self.session.evaluation_model()
         data = evm.results[parameter_key]
@@ -925,17 +955,21 @@ class EvaluationController(ImageController):
                             'brillouin_peak_intensity'][:, :, :, :, :, 1:]\
                         * evm.results['brillouin_peak_fwhm_f'][
                           :, :, :, :, :, 1:]
-                    # Nansum returns 0 if all entries are NaN, dividing by this
-                    # hence gives an invalid value error
+                    # Ignore NaN values by setting them to zero, so we
+                    # can sum the weighted values in a single pass
+                    weight[np.isnan(weight)] = 0
+                    values = data[:, :, :, :, :, 1:]
+                    values = np.where(np.isnan(values), 0, values)
+                    # The sum of the weights is 0 if all entries are NaN,
+                    # dividing by this hence gives an invalid value error
                     with warnings.catch_warnings():
                         warnings.filterwarnings(
                             action='ignore',
                             message='invalid value encountered in divide'
                         )
                         sliced = \
-                            np.nansum(data[:, :, :, :, :, 1:] *
-                                      weight, axis=5)\
-                            / np.nansum(weight, axis=5)
+                            np.einsum('...k,...k->...', values, weight)\
+                            / np.sum(weight, axis=5)
             else:
                 sliced = data[:, :, :, :, :, 0]
         else:
@@ -982,15 +1016,11 @@ class EvaluationController(ImageController):
 
     @staticmethod
     def get_indices_from_key(resolution, key):
-        key = int(key)
-        ind_z = floor(key / (resolution[0] * resolution[1]))
-        ind_y = floor(
-            (key - ind_z * (resolution[0] * resolution[1])) / resolution[0])
-        ind_x = (key % (resolution[0] * resolution[1])) % resolution[0]
-        # ind_y = (key - ind_x) % resolution[0]
-        if ind_x >= resolution[0]\
-                or ind_y >= resolution[1]\
-                or ind_z >= resolution[2]:
+        ind_z, remainder = divmod(int(key), resolution[0] * resolution[1])
+        ind_y, ind_x = divmod(remainder, resolution[0])
+        # ind_x and ind_y are always in range, only a key
+        # beyond the last measurement point is invalid
+        if ind_z >= resolution[2]:
             raise ValueError('Invalid key')
         return ind_x, ind_y, ind_z
 
@@ -1010,30 +1040,47 @@ def calculate_derived_values():
     if evm.results['rayleigh_peak_position_f'].size == 0:
         return
 
-    shape_brillouin = evm.results['brillouin_peak_position_f'].shape
-    shape_rayleigh = evm.results['rayleigh_peak_position_f'].shape
+    brillouin_peaks = evm.results['brillouin_peak_position_f']
+    rayleigh_peaks = evm.results['rayleigh_peak_position_f']
 
     # We calculate every possible combination of
     # Brillouin peak and Rayleigh peak position difference
     # and then use the smallest absolute value.
     # That saves us from sorting Rayleigh peaks to Brillouin peaks,
     # because a Brillouin peak always belongs to the Rayleigh peak nearest.
-    brillouin_shift_f = np.NaN * np.ones((*shape_brillouin, shape_rayleigh[4]))
-    for idx in range(shape_rayleigh[4]):
-        brillouin_shift_f[:, :, :, :, :, :, idx] = abs(
-            evm.results['brillouin_peak_position_f'] -
-            np.tile(
-                evm.results['rayleigh_peak_position_f'][:, :, :, :, [idx], :],
-                (1, 1, 1, 1, 1, shape_brillouin[5])
-            )
+    # np.fmin ignores NaNs like np.nanmin, but accumulating it over the
+    # (few) Rayleigh regions avoids a slow reduction over a short axis.
+    brillouin_shift_f = np.abs(brillouin_peaks - rayleigh_peaks[..., 0:1, :])
+    for idx in range(1, rayleigh_peaks.shape[4]):
+        np.fmin(
+            brillouin_shift_f,
+            np.abs(brillouin_peaks - rayleigh_peaks[..., idx:idx + 1, :]),
+            out=brillouin_shift_f
         )
+    evm.results['brillouin_shift_f'] = brillouin_shift_f
 
-    with warnings.catch_warnings():
-        warnings.filterwarnings(
-            action='ignore',
-            message='All-NaN slice encountered'
-        )
-        evm.results['brillouin_shift_f'] = np.nanmin(brillouin_shift_f, 6)
+
+def _parse_fwhm_limit(limit):
+    """
+    Converts a FWHM bound setting into the limit in Hz
+    """
+    value = _FWHM_LIMITS.get(limit.lower())
+    if value is not None:
+        return value
+    try:
+        return 1e9 * abs(float(limit))
+    except ValueError:
+        return np.inf
+
+
+def _fit_spectra_task(task):
+    """
+    Worker function for fitting the spectra in a process pool.
+    Returns the fits together with the given tag, so the results
+    can be assigned to the position and region they belong to.
+    """
+    tag, args = task
+    return tag, EvaluationController.fit_sliced_spectra(*args)
 
 
 class Controller(object):
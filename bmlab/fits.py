@@ -18,6 +18,42 @@ def lorentz(x, w0, fwhm, intensity):
                ((fwhm / 2) ** 2) / ((x - w0) ** 2 + (fwhm / 2) ** 2)
 
 
+def _lorentz_error(params, xdata, ydata):
+    """
+    Error function of the lorentz fits, the squared residuals
+    of a sum of lorentz functions plus an offset.
+    The parameters are (w0, fwhm, intensity) for every peak,
+    followed by the offset.
+    """
+    residuals = ydata
+    for idx in range(0, len(params) - 1, 3):
+        residuals = residuals - lorentz(xdata, *params[idx:idx + 3])
+    return (residuals - params[-1]) ** 2
+
+
+def _lorentz_error_jacobian(params, xdata, ydata):
+    """
+    Jacobian of the error function of the lorentz fits.
+    """
+    model = params[-1]
+    jacobian = np.ones((len(xdata), len(params)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for idx in range(0, len(params) - 1, 3):
+            w0, fwhm, intensity = params[idx:idx + 3]
+            # The lorentz function and its partial derivatives share
+            # most terms, so we calculate them together here
+            hwhm_squared = (fwhm / 2) ** 2
+            dx = xdata - w0
+            denominator = dx ** 2 + hwhm_squared
+            d_intensity = hwhm_squared / denominator
+            model = model + intensity * hwhm_squared / denominator
+            jacobian[:, idx] = 2 * intensity * d_intensity * dx / denominator
+            jacobian[:, idx + 1] =\
+                intensity * fwhm / 2 * dx ** 2 / denominator ** 2
+            jacobian[:, idx + 2] = d_intensity
+    return -2 * (ydata - model)[:, np.newaxis] * jacobian
+
+
 def fit_lorentz(x, y):
     w0_guess = float(x[np.argmax(y)])
     offset_guess = (y[0] + y[-1]) / 2.
@@ -30,14 +66,10 @@ def fit_lorentz(x, y):
     if fwhm_guess <= 0.0:
         fwhm_guess = 10 * (x[-1] - x[0]) / x.shape[0]
 
-    def error(params, xdata, ydata):
-        return (ydata
-                - lorentz(xdata, *params[0:3])
-                - params[3]) ** 2
-
     opt_result = least_squares(
-        error,
+        _lorentz_error,
         x0=(w0_guess, fwhm_guess, intensity_guess, offset_guess),
+        jac=_lorentz_error_jacobian,
         args=(x, y)
     )
 
@@ -67,21 +99,15 @@ def fit_double_lorentz(x, y, bounds_w0=None, bounds_fwhm=None):
     idx_sort = np.sort(peaks[idx[0:2]])
     w0_guess = list(x[idx_sort])
 
-    def error(params, xdata, ydata):
-        return (ydata
-                - lorentz(xdata, *params[0:3])
-                - lorentz(xdata, *params[3:6])
-                - params[6]) ** 2
-
     # Create the bounds array
     if bounds_w0 is None and bounds_fwhm is None:
-        bounds = (-np.Inf, np.Inf)
+        bounds = (-np.inf, np.inf)
     else:
         # Initialize the bounds
         # Lower limits
-        bounds_lower = -np.Inf * np.ones(7)
+        bounds_lower = np.full(7, -np.inf)
         # Upper limits
-        bounds_upper = np.Inf * np.ones(7)
+        bounds_upper = np.full(7, np.inf)
 
         # full-width-half-maximum
         # The VIPA spectrometer has an instrument width of
@@ -140,11 +166,12 @@ def fit_double_lorentz(x, y, bounds_w0=None, bounds_fwhm=None):
         bounds = (bounds_lower, bounds_upper)
 
     opt_result = least_squares(
-        error,
+        _lorentz_error,
         x0=(w0_guess[0], fwhm_guess[0], intensity_guess,
             w0_guess[1], fwhm_guess[1], intensity_guess,
             offset_guess
             ),
+        jac=_lorentz_error_jacobian,
         args=(x, y),
         bounds=bounds
     )
@@ -176,23 +203,15 @@ def fit_quadruple_lorentz(x, y, bounds_w0=None, bounds_fwhm=None):
     idx_sort = np.sort(peaks[idx[0:4]])
     w0_guess = list(x[idx_sort])
 
-    def error(params, xdata, ydata):
-        return (ydata
-                - lorentz(xdata, *params[0:3])
-                - lorentz(xdata, *params[3:6])
-                - lorentz(xdata, *params[6:9])
-                - lorentz(xdata, *params[9:12])
-                - params[12]) ** 2
-
     # Create the bounds array
     if bounds_w0 is None and bounds_fwhm is None:
-        bounds = (-np.Inf, np.Inf)
+        bounds = (-np.inf, np.inf)
     else:
         # Initialize the bounds
         # Lower limits
-        bounds_lower = -np.Inf * np.ones(13)
+        bounds_lower = np.full(13, -np.inf)
         # Upper limits
-        bounds_upper = np.Inf * np.ones(13)
+        bounds_upper = np.full(13, np.inf)
 
         # The VIPA spectrometer has an instrument width of
         # approx. 750 MHz for the FOB setup
@@ -269,13 +288,14 @@ def fit_quadruple_lorentz(x, y, bounds_w0=None, bounds_fwhm=None):
         bounds = (bounds_lower, bounds_upper)
 
     opt_result = least_squares(
-        error,
+        _lorentz_error,
         x0=(w0_guess[0], fwhm_guess[0], intensity_guess,
             w0_guess[1], fwhm_guess[1], intensity_guess,
             w0_guess[2], fwhm_guess[2], intensity_guess,
             w0_guess[3], fwhm_guess[3], intensity_guess,
             offset_guess
             ),
+        jac=_lorentz_error_jacobian,
         args=(x, y),
         bounds=bounds
     )
@@ -371,11 +391,50 @@ def fit_lorentz_region(region, xdata, ydata, nr_peaks=1,
     -------
     center, full-width-half-maximum, intensity and offset
     """
+    x, y = slice_region(region, xdata, ydata)
+    return fit_lorentz_peaks(x, y, nr_peaks, bounds_w0, bounds_fwhm)
+
+
+def slice_region(region, xdata, ydata):
+    """
+    Returns the section of the data within the given region
+
+    Parameters
+    ----------
+    region: The limits of the region on the x-axis
+    xdata: The x-data
+    ydata: The y-data
+
+    Returns
+    -------
+    The x- and y-data of the region
+    """
     try:
         idx_l = np.nanargmin(np.abs(xdata - region[0]))
         idx_r = np.nanargmin(np.abs(xdata - region[1]))
-        x = xdata[idx_l:idx_r]
-        y = ydata[idx_l:idx_r]
+    except ValueError:
+        # All values of xdata are NaN
+        return xdata[0:0], ydata[0:0]
+    return xdata[idx_l:idx_r], ydata[idx_l:idx_r]
+
+
+def fit_lorentz_peaks(x, y, nr_peaks=1, bounds_w0=None, bounds_fwhm=None):
+    """
+    Fits a lorentz or multi lorentz fit to the given data
+
+    Parameters
+    ----------
+    x: The x-data of the region to fit
+    y: The y-data of the region to fit
+    nr_peaks: The number of peaks to fit
+    bounds_w0: The bounds for the lorentz fit value of the maximum position
+    bounds_fwhm: The bounds for the lorentz fit value of the peak width
+
+    Returns
+    -------
+    center, full-width-half-maximum, intensity and offset
+    """
+    try:
         if nr_peaks == 1:
             w0s, fwhms, intensities, offset = fit_lorentz(
                 x, y)
@@ -1,14 +1,11 @@
 import numpy as np
 import math
-from shapely.geometry import Polygon, Point
 from bmlab.utils import debug_timer
 
 
 class Circle(object):
     """
     Representation of a circle.
-
-    Wraps shapely-API for reduced complexity.
     """
 
     def __init__(self, center, radius):
@@ -84,10 +81,29 @@ class Circle(object):
         """
         if not self.valid:
             return None
-        center = Point(self.center)
-        inter = center.buffer(self.radius).boundary.intersection(
-            rect.poly).boundary
-        return [(p.x, p.y) for p in inter.geoms]
+        points = set()
+        # Solve the circle equation on every edge of the rectangle,
+        # axis is the axis the edge is perpendicular to
+        for axis in (0, 1):
+            other = 1 - axis
+            for edge in (0, rect.shape[axis]):
+                distance = edge - self.center[axis]
+                discriminant = self.radius ** 2 - distance ** 2
+                # Skip edges the circle doesn't cross
+                if discriminant <= 0:
+                    continue
+                root = math.sqrt(discriminant)
+                for value in (self.center[other] - root,
+                              self.center[other] + root):
+                    if 0 <= value <= rect.shape[other]:
+                        point = [0., 0.]
+                        point[axis] = float(edge)
+                        point[other] = float(value)
+                        points.add(tuple(point))
+        # A single point means the circle only touches a corner
+        if len(points) < 2:
+            return []
+        return sorted(points)
 
     def angle(self, point):
         """
@@ -105,8 +121,8 @@ class Circle(object):
         """
         if not self.valid:
             return None
-        delta = np.array(point) - self.center
-        angle = math.atan2(delta[1], delta[0])
+        angle = math.atan2(point[1] - self.center[1],
+                           point[0] - self.center[0])
         if angle < 0:
             angle = angle + 2 * np.pi
         return angle
@@ -118,8 +134,7 @@ class Circle(object):
 
 class Rectangle(object):
     def __init__(self, shape):
-        self.poly = Polygon(
-            [(0, 0), (0, shape[1]), (shape[0], shape[1]), (shape[0], 0)])
+        self.shape = tuple(shape[:2])
 
 
 @debug_timer
@@ -3,9 +3,10 @@ Module to perform common image operations.
 """
 
 import logging
+from math import ceil, floor
 
 import numpy as np
-from scipy import interpolate
+from scipy.signal import fftconvolve
 import warnings
 
 
@@ -15,6 +16,39 @@ class AutofindException(Exception):
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of interpolated values
+# extract_lines_along_arc holds in memory at once
+# (256 kB, so the temporary arrays stay in the cache)
+_EXTRACTION_BLOCK_SIZE = 2 ** 15
+
+_MEDIAN_9_NETWORK = (
+    (1, 2), (4, 5), (7, 8), (0, 1), (3, 4), (6, 7), (1, 2), (4, 5), (7, 8),
+    (0, 3), (5, 8), (4, 7), (3, 6), (1, 4), (2, 5), (4, 7), (4, 2), (6, 4),
+    (4, 2),
+)
+
+# Every combination of rotation and flips can be expressed as
+# reversing the image axes followed by an optional transposition.
+# Maps (rotate, flip_ud, flip_lr) to (transpose, step_0, step_1).
+_ORIENTATIONS = {
+    (0, False, False): (False, 1, 1),
+    (0, False, True): (False, 1, -1),
+    (0, True, False): (False, -1, 1),
+    (0, True, True): (False, -1, -1),
+    (1, False, False): (True, -1, 1),
+    (1, False, True): (True, 1, 1),
+    (1, True, False): (True, -1, -1),
+    (1, True, True): (True, 1, -1),
+    (2, False, False): (False, -1, -1),
+    (2, False, True): (False, -1, 1),
+    (2, True, False): (False, 1, -1),
+    (2, True, True): (False, 1, 1),
+    (3, False, False): (True, 1, -1),
+    (3, False, True): (True, -1, -1),
+    (3, True, False): (True, 1, 1),
+    (3, True, True): (True, -1, 1),
+}
+
 
 def set_orientation(image, rotate=0, flip_ud=False, flip_lr=False):
     """
@@ -45,29 +79,18 @@ def set_orientation(image, rotate=0, flip_ud=False, flip_lr=False):
     --------
     numpy.rot90, numpy.flipud, numpy.fliplr
     """
-    if np.shape(np.shape(image)) == (2,):
-        if rotate != 0:
-            image = np.rot90(image, k=rotate, axes=(1, 0))
-
-        if flip_ud:
-            image = np.flipud(image)
-
-        if flip_lr:
-            image = np.fliplr(image)
-    elif np.shape(np.shape(image)) == (3,):
-        if rotate != 0:
-            image = np.rot90(image, k=rotate, axes=(2, 1))
-
-        if flip_ud:
-            image = image[:, ::-1, :]
-
-        if flip_lr:
-            image = image[:, :, ::-1]
-    else:
+    image = np.asarray(image)
+    if image.ndim not in (2, 3):
         raise ValueError(
             'Given Argument is not a two or three dimensional array'
         )
 
+    transpose, step_0, step_1 =\
+        _ORIENTATIONS[(rotate % 4, bool(flip_ud), bool(flip_lr))]
+    image = image[..., ::step_0, ::step_1]
+    if transpose:
+        image = image.swapaxes(-1, -2)
+
     return image
 
 
@@ -89,25 +112,144 @@ def find_max_in_radius(img, xy0, radius):
     out: tuple
         x-y indices of the point of max. value
     """
-    x, y = list(range(img.shape[0])), list(range(img.shape[1]))
-    X, Y = np.meshgrid(x, y, indexing='ij')
     x0, y0 = xy0
-    flat_img = np.nan * np.ones_like(img)
+    # Only look at the bounding box of the circle
+    x_min = max(ceil(x0 - radius), 0)
+    x_max = min(floor(x0 + radius) + 1, img.shape[0])
+    y_min = max(ceil(y0 - radius), 0)
+    y_max = min(floor(y0 + radius) + 1, img.shape[1])
+    X, Y = np.ogrid[x_min:x_max, y_min:y_max]
     mask = (X - x0) ** 2 + (Y - y0) ** 2 <= radius ** 2
-    flat_img[mask] = img[mask]
-    peak_idx = np.nanargmax(flat_img)
-    peak_x, peak_y = np.unravel_index(peak_idx, img.shape, order='C')
-    return peak_x, peak_y
+    window = np.where(mask, img[x_min:x_max, y_min:y_max], np.nan)
+    peak_idx = np.nanargmax(window)
+    peak_x, peak_y = np.unravel_index(peak_idx, window.shape, order='C')
+    return peak_x + x_min, peak_y + y_min
+
+
+def median_filter_3x3(image):
+    """
+    Median filter of a 2D image with a 3x3 kernel.
+
+    Equal to scipy.signal.medfilt2d with the default kernel size
+    (zero padded at the edges), but calculated with a sorting
+    network on shifted views of the image, which is faster.
+
+    Parameters
+    ----------
+    image: numpy.ndarray (2D)
+        the image data
+
+    Returns
+    -------
+    out: numpy.ndarray (2D)
+        the median filtered image
+    """
+    padded = np.pad(np.asarray(image, dtype=float), 1)
+    m, n = np.shape(image)
+    values = [padded[i:i + m, j:j + n] for i in range(3) for j in range(3)]
+    # Sorting network for the median of nine values,
+    # the median ends up at index 4
+    for i, j in _MEDIAN_9_NETWORK:
+        values[i], values[j] =\
+            np.minimum(values[i], values[j]), np.maximum(values[i], values[j])
+    return values[4]
+
+
+def binary_closing(image, footprint):
+    """
+    Morphological closing of a binary image.
+
+    Equal to skimage.morphology.closing with mode='reflect', but the
+    dilation and erosion are calculated by FFT convolutions, which is
+    much faster for large footprints.
+
+    Parameters
+    ----------
+    image: numpy.ndarray (2D)
+        the binary image
+    footprint: numpy.ndarray (2D)
+        the binary footprint, e.g. skimage.morphology.disk
+
+    Returns
+    -------
+    out: numpy.ndarray (2D)
+        the closed binary image
+    """
+    footprint = np.asarray(footprint, dtype=float)
+    # Footprints with an even size are padded at the start,
+    # in the same way as skimage does it
+    footprint = np.pad(footprint, [(1 - s % 2, 0) for s in footprint.shape])
+    pad = tuple((s // 2, s // 2) for s in footprint.shape)
+    inner = tuple(slice(p, p + s) for (p, _), s in zip(pad, image.shape))
+
+    # Dilation: a pixel is set if any pixel under the footprint is set
+    padded = np.pad(np.asarray(image, dtype=float), pad, mode='symmetric')
+    dilated = fftconvolve(
+        padded, footprint[::-1, ::-1], mode='same')[inner] > 0.5
+
+    # Erosion: a pixel is set if no pixel under the
+    # mirrored footprint is unset
+    padded = np.pad(~dilated, pad, mode='symmetric').astype(float)
+    return fftconvolve(padded, footprint, mode='same')[inner] < 0.5
 
 
 def extract_lines_along_arc(img, arc):
+    """
+    Extracts the values along an arc from an image or a stack of images.
+
+    The image is interpolated bilinearly at all points of the arc and the
+    values of every line perpendicular to the arc are averaged.
+
+    Parameters
+    ----------
+    img: numpy.ndarray
+        Array of two or three dimensions (containing multiple
+        images along the first dimension in case of 3D)
+    arc: numpy.ndarray (3D)
+        The pixel positions of the arc, the lines along the first
+        dimension, the points of a line along the second dimension
+
+    Returns
+    -------
+    out: numpy.ndarray
+        The values along the arc, for every image
+        along the first dimension in case of 3D
+    """
     if arc.ndim != 3 or arc.shape[2] != 2:
         return
 
-    m, n = img.shape
-    func = interpolate.RegularGridInterpolator(
-        (np.arange(m), np.arange(n)), img, method='linear', bounds_error=False)
+    imgs = np.asarray(img)
+    if imgs.ndim == 2:
+        return extract_lines_along_arc(imgs[np.newaxis, ...], arc)[0]
+
+    m, n = imgs.shape[1:]
+    x = arc[:, :, 0]
+    y = arc[:, :, 1]
+    # Points outside of the image give NaN
+    valid = (x >= 0) & (x <= m - 1) & (y >= 0) & (y <= n - 1)
+    x = np.where(valid, x, 0)
+    y = np.where(valid, y, 0)
+
+    # The indices of the pixels surrounding every point
+    # and the weights for the bilinear interpolation.
+    # They are the same for all images.
+    x0 = np.clip(np.floor(x).astype(int), 0, max(m - 2, 0))
+    y0 = np.clip(np.floor(y).astype(int), 0, max(n - 2, 0))
+    x1 = np.minimum(x0 + 1, m - 1)
+    y1 = np.minimum(y0 + 1, n - 1)
+    dx = x - x0
+    dy = y - y0
+    corners = (
+        (x0, y0, (1 - dx) * (1 - dy)),
+        (x1, y0, dx * (1 - dy)),
+        (x0, y1, (1 - dx) * dy),
+        (x1, y1, dx * dy),
+    )
 
+    # We process the images in blocks, so the size of the
+    # temporary arrays does not grow with the number of images
+    block_size = max(1, _EXTRACTION_BLOCK_SIZE // x.size)
+    spectra = np.empty((len(imgs), x.shape[0]))
     # In case the arc crosses the edge of the image, the interpolated array
     # will contain rows with only NaNs leading to an empty slice warning
     with warnings.catch_warnings():
@@ -115,4 +257,11 @@ def extract_lines_along_arc(img, arc):
             action='ignore',
             message='Mean of empty slice'
         )
-        return np.nanmean(func((arc[:, :, 0], arc[:, :, 1])), 1)
+        for start in range(0, len(imgs), block_size):
+            block = imgs[start:start + block_size]
+            values = np.zeros((len(block), *x.shape))
+            for xi, yi, weight in corners:
+                values += block[:, xi, yi] * weight
+            values[:, ~valid] = np.nan
+            spectra[start:start + block_size] = np.nanmean(values, 2)
+    return spectra
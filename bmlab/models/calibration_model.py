@@ -399,11 +399,19 @@ class FitSet(Serializer):
         key = self.make_key(calib_key, region_key, frame_num)
         return self.fits.get(key)
 
+    def make_prefix(self, calib_key, region_key=None):
+        """
+        Returns the common start of the keys of all fits
+        of a calibration, optionally only of one region
+        """
+        if region_key is None:
+            return calib_key + '::'
+        return self.make_key(calib_key, region_key, '')
+
     def clear(self, calib_key):
-        keys = []
-        for key, value in self.fits.items():
-            if calib_key == self.split_key(key)[0]:
-                keys.append(key)
+        # Comparing the key prefix is much faster than splitting the keys
+        prefix = self.make_prefix(calib_key)
+        keys = [key for key in self.fits if key.startswith(prefix)]
         for key in keys:
             del self.fits[key]
 
@@ -411,11 +419,9 @@ class FitSet(Serializer):
 class RayleighFitSet(FitSet, Serializer):
 
     def average_fits(self, calib_key, region_key):
-        w0s = []
-        for key, fit in self.fits.items():
-            calib_key_, region_key_, _ = self.split_key(key)
-            if calib_key == calib_key_ and region_key == region_key_:
-                w0s.append(fit.w0)
+        prefix = self.make_prefix(calib_key, region_key)
+        w0s = [fit.w0 for key, fit in self.fits.items()
+               if key.startswith(prefix)]
         logger.debug('w0s = ', w0s)
         if w0s:
             return np.mean(w0s)
@@ -425,11 +431,9 @@ class RayleighFitSet(FitSet, Serializer):
 class BrillouinFitSet(FitSet, Serializer):
 
     def average_fits(self, calib_key, region_key):
-        w0s = []
-        for key, fit in self.fits.items():
-            calib_key_, region_key_, _ = self.split_key(key)
-            if calib_key == calib_key_ and region_key == region_key_:
-                w0s.append(fit.w0s)
+        prefix = self.make_prefix(calib_key, region_key)
+        w0s = [fit.w0s for key, fit in self.fits.items()
+               if key.startswith(prefix)]
         logger.debug('w0s = ', w0s)
         if w0s:
             w0s = np.array(w0s)
@@ -41,15 +41,13 @@ class EvaluationModel(Serializer):
         # Check that the results array also stores the peak offset
         # @since 0.4.0
         if 'brillouin_peak_offset' not in self.results:
-            self.results['brillouin_peak_offset'] = np.empty(
-                self.results['brillouin_peak_intensity'].shape
+            self.results['brillouin_peak_offset'] = np.full(
+                self.results['brillouin_peak_intensity'].shape, np.nan
             )
-            self.results['brillouin_peak_offset'][:] = np.nan
         if 'rayleigh_peak_offset' not in self.results:
-            self.results['rayleigh_peak_offset'] = np.empty(
-                self.results['rayleigh_peak_intensity'].shape
+            self.results['rayleigh_peak_offset'] = np.full(
+                self.results['rayleigh_peak_intensity'].shape, np.nan
             )
-            self.results['rayleigh_peak_offset'][:] = np.nan
         # Migrations from 0.4.0 to 0.5.0
         # @since 0.5.0
         if 'rayleigh_shift' not in self.results:
@@ -61,15 +59,13 @@ class EvaluationModel(Serializer):
         # Migrations from 0.5.1 to 0.6.0
         # @since 0.6.0
         if 'brillouin_peak_position_f' not in self.results:
-            self.results['brillouin_peak_position_f'] = np.empty(
-                self.results['brillouin_peak_position'].shape
+            self.results['brillouin_peak_position_f'] = np.full(
+                self.results['brillouin_peak_position'].shape, np.nan
             )
-            self.results['brillouin_peak_position_f'][:] = np.nan
         if 'rayleigh_peak_position_f' not in self.results:
-            self.results['rayleigh_peak_position_f'] = np.empty(
-                self.results['rayleigh_peak_position'].shape
+            self.results['rayleigh_peak_position_f'] = np.full(
+                self.results['rayleigh_peak_position'].shape, np.nan
             )
-            self.results['rayleigh_peak_position_f'][:] = np.nan
         del_keys = [
             'brillouin_shift',
             'brillouin_peak_fwhm',
@@ -174,11 +170,9 @@ class EvaluationModel(Serializer):
             1,  # Brillouin array and reshapes are reduced
         )
 
-        self.results['intensity'] = np.empty(shape_general)
-        self.results['intensity'][:] = np.nan
+        self.results['intensity'] = np.full(shape_general, np.nan)
 
-        self.results['time'] = np.empty(shape_general)
-        self.results['time'][:] = np.nan
+        self.results['time'] = np.full(shape_general, np.nan)
 
         # We always do a single-peak fit, plus a multi-peak fit if requested.
         # Hence, we have to store
@@ -196,20 +190,19 @@ class EvaluationModel(Serializer):
             nr_brillouin_peaks_to_store,
         )
 
-        self.results['brillouin_peak_position_f'] = np.empty(shape_brillouin)
-        self.results['brillouin_peak_position_f'][:] = np.nan
+        self.results['brillouin_peak_position_f'] =\
+            np.full(shape_brillouin, np.nan)
 
-        self.results['brillouin_peak_intensity'] = np.empty(shape_brillouin)
-        self.results['brillouin_peak_intensity'][:] = np.nan
+        self.results['brillouin_peak_intensity'] =\
+            np.full(shape_brillouin, np.nan)
 
-        self.results['brillouin_peak_offset'] = np.empty(shape_brillouin)
-        self.results['brillouin_peak_offset'][:] = np.nan
+        self.results['brillouin_peak_offset'] =\
+            np.full(shape_brillouin, np.nan)
 
-        self.results['brillouin_shift_f'] = np.empty(shape_brillouin)
-        self.results['brillouin_shift_f'][:] = np.nan
+        self.results['brillouin_shift_f'] = np.full(shape_brillouin, np.nan)
 
-        self.results['brillouin_peak_fwhm_f'] = np.empty(shape_brillouin)
-        self.results['brillouin_peak_fwhm_f'][:] = np.nan
+        self.results['brillouin_peak_fwhm_f'] =\
+            np.full(shape_brillouin, np.nan)
 
         shape_rayleigh = (
             dims['dim_x'],
@@ -221,20 +214,17 @@ class EvaluationModel(Serializer):
                 #  Brillouin array and reshapes are reduced
         )
 
-        self.results['rayleigh_peak_position_f'] = np.empty(shape_rayleigh)
-        self.results['rayleigh_peak_position_f'][:] = np.nan
+        self.results['rayleigh_peak_position_f'] =\
+            np.full(shape_rayleigh, np.nan)
 
-        self.results['rayleigh_peak_intensity'] = np.empty(shape_rayleigh)
-        self.results['rayleigh_peak_intensity'][:] = np.nan
+        self.results['rayleigh_peak_intensity'] =\
+            np.full(shape_rayleigh, np.nan)
 
-        self.results['rayleigh_peak_offset'] = np.empty(shape_rayleigh)
-        self.results['rayleigh_peak_offset'][:] = np.nan
+        self.results['rayleigh_peak_offset'] = np.full(shape_rayleigh, np.nan)
 
-        self.results['rayleigh_peak_fwhm_f'] = np.empty(shape_rayleigh)
-        self.results['rayleigh_peak_fwhm_f'][:] = np.nan
+        self.results['rayleigh_peak_fwhm_f'] = np.full(shape_rayleigh, np.nan)
 
-        self.results['rayleigh_shift'] = np.empty(shape_rayleigh)
-        self.results['rayleigh_shift'][:] = np.nan
+        self.results['rayleigh_shift'] = np.full(shape_rayleigh, np.nan)
 
     def set_spectra(self, image_key, spectra):
         self.spectra[image_key] = spectra
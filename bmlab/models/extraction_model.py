@@ -186,11 +186,12 @@ class ExtractionModel(Serializer):
     @staticmethod
     def get_arc_from_circle_phis(circle, phis, arc_width):
         pos_e_r = np.arange(-arc_width, arc_width + 1)[..., None]
-        arc = np.ndarray((len(phis), len(pos_e_r), 2))
-        for i, phi in enumerate(phis):
-            mid_point, e_r = circle.point(phi)
-            arc[i, :, :] = mid_point + e_r * pos_e_r
-        return arc
+        # The radial unit vectors of all points at once,
+        # see Circle.point
+        phis = np.asarray(phis, dtype=float)
+        e_r = np.stack((np.cos(phis), np.sin(phis)), axis=-1)[:, None, :]
+        mid_points = circle.center + circle.radius * e_r
+        return mid_points + e_r * pos_e_r
 
     # TODO: This needs to be called automatically
     #  on file load or when the image orientation is changed
@@ -1,17 +1,17 @@
-import numpy as np
-
-
 def regions_merge_add_region(regions, region):
+    # The regions only have two entries, so the builtin
+    # min and max are much faster than their numpy versions
+    region_min, region_max = min(region), max(region)
     regions_fused = False
 
     # check if the selected regions overlap
     for i, saved_region in enumerate(regions):
-        if (np.min(region) < np.max(saved_region)
-                and (np.max(region) > np.min(saved_region))):
+        saved_min, saved_max = min(saved_region), max(saved_region)
+        if region_min < saved_max and region_max > saved_min:
             # fuse overlapping regions
             regions[i] = (
-                np.min([region, saved_region]),
-                np.max([region, saved_region]))
+                min(region_min, saved_min),
+                max(region_max, saved_max))
             regions_fused = True
 
     if not regions_fused:
@@ -28,4 +28,4 @@ def regions_check_order(regions):
     regions: array containing regions
 
     """
-    regions.sort(key=np.mean)
+    regions.sort(key=lambda region: sum(region) / len(region))
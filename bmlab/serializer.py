@@ -11,10 +11,15 @@ import numbers
 import builtins
 
 import h5py
+import numpy as np
 
 
 logger = logging.getLogger(__name__)
 
+# Numerical arrays with at least this many elements are stored
+# chunked and compressed, smaller ones are not worth the overhead
+_COMPRESSION_MIN_SIZE = 1024
+
 
 class Serializer(object):
 
@@ -40,7 +45,16 @@ class Serializer(object):
             self.serialize(group, key)
 
     def serialize_array(self, parent, array, name):
-        parent.create_dataset(name, data=array)
+        array = np.asarray(array)
+        if array.dtype.kind in 'biuf'\
+                and array.size >= _COMPRESSION_MIN_SIZE:
+            # gzip is available in every HDF5 build, so the session
+            # files stay readable with tools other than h5py
+            parent.create_dataset(name, data=array, chunks=True,
+                                  compression='gzip', compression_opts=1,
+                                  shuffle=True)
+        else:
+            parent.create_dataset(name, data=array)
 
     def serialize_string(self, parent, string, name):
         ds = parent.create_dataset(name, data=string,
@@ -1,6 +1,8 @@
 import os
 import errno
 
+from concurrent.futures import ProcessPoolExecutor
+
 from pathlib import Path
 from functools import reduce
 
@@ -125,6 +127,7 @@ class Session(Serializer):
             raise Exception('Session is a singleton!')
         else:
             Session.__instance = self
+            self._pool = None
             self.clear()
 
     def current_repetition(self):
@@ -200,6 +203,39 @@ class Session(Serializer):
             Session()
         return Session.__instance
 
+    def get_pool_size(self):
+        """
+        Returns the number of worker processes used for fitting.
+        """
+        # The fits are CPU bound, so the pool uses its default
+        # of one process per CPU (limited to 61 on Windows)
+        return self.get_pool()._max_workers
+
+    def get_pool(self):
+        """
+        Returns the process pool used for fitting.
+
+        The pool is created on first use and then reused
+        for all evaluations, so the worker processes
+        only have to be started once. It is shut down
+        when the session is cleared.
+
+        Returns
+        -------
+        out: ProcessPoolExecutor
+        """
+        if getattr(self, '_pool', None) is None:
+            self._pool = ProcessPoolExecutor()
+        return self._pool
+
+    def shutdown_pool(self):
+        """
+        Shuts down the worker processes used for fitting.
+        """
+        if getattr(self, '_pool', None) is not None:
+            self._pool.shutdown()
+            self._pool = None
+
     def set_file(self, file_name):
         """
         Set the file to be processed.
@@ -218,42 +254,32 @@ class Session(Serializer):
         if file_name is None:
             raise Exception('No source data file found')
 
-        try:
-            file = BrillouinFile(file_name)
-        except Exception as e:
-            raise e
-        else:
-            """ Only load data if the file could be opened """
-            session = Session.get_instance()
-            session.file = file
-            session.extraction_models = {
-                key: ExtractionModel()
-                for key in self.file.repetition_keys()
-            }
-            session.calibration_models = {
-                key: CalibrationModel()
-                for key in self.file.repetition_keys()
-            }
-            session.peak_selection_models = {
-                key: PeakSelectionModel()
-                for key in self.file.repetition_keys()
-            }
-            session.evaluation_models = {
-                key: EvaluationModel()
-                for key in self.file.repetition_keys()
-            }
-            self.set_image_shape()
-            self.set_arc_width()
-            # Initialize current setup
-            session.setup = AVAILABLE_SETUPS[0]
-
-        try:
-            self.load(file_name)
-            self.set_arc_width()
-        except Exception as e:
-            raise e
-        else:
-            Session.get_instance().file = file
+        file = BrillouinFile(file_name)
+        # Release the previously opened file
+        if self.file is not None:
+            self.file.close()
+        self.file = file
+
+        repetition_keys = file.repetition_keys()
+        self.extraction_models = {
+            key: ExtractionModel() for key in repetition_keys
+        }
+        self.calibration_models = {
+            key: CalibrationModel() for key in repetition_keys
+        }
+        self.peak_selection_models = {
+            key: PeakSelectionModel() for key in repetition_keys
+        }
+        self.evaluation_models = {
+            key: EvaluationModel() for key in repetition_keys
+        }
+        self.set_image_shape()
+        # Initialize current setup
+        self.setup = AVAILABLE_SETUPS[0]
+
+        # The models stored in the session file replace the new ones
+        self.load(file_name)
+        self.set_arc_width()
 
     def get_calib_keys(self, sort_by_time=False):
         if self.current_repetition() is None:
@@ -370,6 +396,8 @@ class Session(Serializer):
 
         self._current_repetition_key = None
 
+        self.shutdown_pool()
+
     def set_setup(self, setup):
         self.setup = setup
 
@@ -388,8 +416,10 @@ class Session(Serializer):
         session_file_name = get_session_file_path(self.file.path,
                                                   create_folder=True)
 
-        with h5py.File(session_file_name, 'w') as f:
-            self.serialize(f, 'session', skip=['file'])
+        # The file format of HDF5 1.8 stores the many small groups
+        # of a session much more compactly than the default one
+        with h5py.File(session_file_name, 'w', libver='v108') as f:
+            self.serialize(f, 'session', skip=['file', '_pool'])
             # Store the current bmlab version
             f.attrs['version'] = 'bmlab_' + version
 
@@ -413,7 +443,14 @@ class Session(Serializer):
             new_session = Serializer.deserialize(f['session'])
             session = Session.get_instance()
             for var_name, var_value in new_session.__dict__.items():
-                session.__dict__[var_name] = var_value
+                current_value = session.__dict__.get(var_name)
+                # Keep the models of repetitions
+                # not stored in the session file
+                if isinstance(var_value, dict)\
+                        and isinstance(current_value, dict):
+                    current_value.update(var_value)
+                else:
+                    session.__dict__[var_name] = var_value
 
         self.run_migrations()
 
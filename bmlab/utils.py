@@ -18,6 +18,43 @@ def debug_timer(func):
     return wrapper
 
 
+def nanmean(a, axis=None):
+    """
+    Compute the arithmetic mean along the specified axis, ignoring NaNs.
+
+    Same as numpy.nanmean, but faster for arrays without NaNs:
+    numpy.nanmean always creates a copy of floating point arrays with
+    the NaNs replaced. We first sum along the axis, which also tells us
+    whether there are NaNs, and only fall back to numpy.nanmean
+    if there are any.
+
+    Parameters
+    ----------
+    a: array_like
+        Array containing numbers whose mean is desired
+    axis: int or tuple of ints
+        Axis or axes along which the means are computed
+
+    Returns
+    -------
+    out: numpy.ndarray
+        The mean values
+    """
+    a = np.asanyarray(a)
+    if not np.issubdtype(a.dtype, np.inexact):
+        return np.mean(a, axis=axis)
+    if a.size:
+        total = np.sum(a, axis=axis)
+        if not np.isnan(total).any():
+            # Divide in the same way as numpy.mean does
+            count = a.size // np.size(total)
+            if isinstance(total, np.ndarray):
+                return np.true_divide(total, count, out=total,
+                                      casting='unsafe')
+            return total.dtype.type(total / count)
+    return np.nanmean(a, axis=axis)
+
+
 def array_dump(name, arr):
     """
     A utility function for dumping numpy arrays to disk.
@@ -45,7 +45,6 @@ setup(
                       "pytest_mock",
                       "scikit-image>=0.19.0",
                       "scipy",
-                      "shapely>=1.8.2"
                       ],
     # not to be confused with definitions in pyproject.toml [build-system]
     python_requires=">=3.9",
@@ -355,6 +355,11 @@ def test_RayleighFitSet_average_fits():
                         10, 1, 300, 100)
     cm.add_rayleigh_fit('0', 0, 1,
                         12, 1, 300, 100)
+    # Fits of other regions and calibrations are ignored
+    cm.add_rayleigh_fit('0', 10, 0,
+                        20, 1, 300, 100)
+    cm.add_rayleigh_fit('00', 0, 0,
+                        20, 1, 300, 100)
 
     w0_avg = cm.rayleigh_fits.average_fits('0', 0)
 
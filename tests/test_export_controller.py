@@ -1,7 +1,6 @@
 from pathlib import Path
 import pytest
 import shutil
-import uuid
 import os
 
 from bmlab.session import Session
@@ -9,20 +8,11 @@ from bmlab.controllers import ExportController
 
 
 @pytest.fixture()
-def tmp_dir():
-    current_path = Path.cwd()
-    tmp_dir = Path.cwd() / f"tmp{str(uuid.uuid4())}" / 'RawData'
-    if not os.path.exists(tmp_dir):
-        os.makedirs(tmp_dir, exist_ok=True)
-    os.chdir(tmp_dir)
-    yield tmp_dir
-    os.chdir(current_path)
-    try:
-        shutil.rmtree(tmp_dir.parent)
-    # Windows sometimes does not correctly close the HDF file. Then we have a
-    # file access conflict.
-    except Exception as e:
-        print(e)
+def tmp_dir(tmp_path):
+    # The exports are written next to the 'RawData' folder
+    tmp_dir = tmp_path / 'RawData'
+    tmp_dir.mkdir()
+    return tmp_dir
 
 
 def data_file_path(file_name):
@@ -31,10 +21,10 @@ def data_file_path(file_name):
 
 def test_export_fluorescence(tmp_dir):
     shutil.copy(
-        data_file_path('Fluorescence.h5'), Path.cwd() / 'Fluorescence.h5')
+        data_file_path('Fluorescence.h5'), tmp_dir / 'Fluorescence.h5')
 
     session = Session.get_instance()
-    session.set_file(Path('Fluorescence.h5'))
+    session.set_file(tmp_dir / 'Fluorescence.h5')
 
     ec = ExportController()
     config = ec.get_configuration()
@@ -69,10 +59,10 @@ def test_export_fluorescence(tmp_dir):
 
 def test_export_fluorescence_combined(tmp_dir):
     shutil.copy(
-        data_file_path('Fluorescence.h5'), Path.cwd() / 'Fluorescence.h5')
+        data_file_path('Fluorescence.h5'), tmp_dir / 'Fluorescence.h5')
 
     session = Session.get_instance()
-    session.set_file(Path('Fluorescence.h5'))
+    session.set_file(tmp_dir / 'Fluorescence.h5')
 
     ec = ExportController()
     config = ec.get_configuration()
@@ -119,10 +109,10 @@ def test_export_fluorescence_combined(tmp_dir):
 
 def test_export_brillouin_2D(tmp_dir):
     shutil.copy(
-        data_file_path('2D-xy.h5'), Path.cwd() / '2D-xy.h5')
+        data_file_path('2D-xy.h5'), tmp_dir / '2D-xy.h5')
 
     session = Session.get_instance()
-    session.set_file(Path('2D-xy.h5'))
+    session.set_file(tmp_dir / '2D-xy.h5')
 
     ec = ExportController()
     config = ec.get_configuration()
@@ -165,10 +155,10 @@ def test_export_brillouin_2D(tmp_dir):
 
 def test_export_brillouin_3D(tmp_dir):
     shutil.copy(
-        data_file_path('3D.h5'), Path.cwd() / '3D.h5')
+        data_file_path('3D.h5'), tmp_dir / '3D.h5')
 
     session = Session.get_instance()
-    session.set_file(Path('3D.h5'))
+    session.set_file(tmp_dir / '3D.h5')
 
     ec = ExportController()
     config = ec.get_configuration()
@@ -109,6 +109,10 @@ def test_distance_point_to_line():
     np.testing.assert_almost_equal(np.sqrt(0.5), ec.distance_point_to_line(
         (0, 1), (1, 1), (0, 0)
     ))
+    np.testing.assert_array_almost_equal(
+        [0, np.sqrt(0.5)], ec.distance_point_to_line(
+            np.array([(0.5, 0.5), (0, 1)]), (1, 1), (0, 0)
+        ))
 
 
 def test_find_points(mocker):
@@ -4,7 +4,8 @@ import numpy as np
 
 from bmlab.fits import lorentz, fit_lorentz, fit_circle, \
     fit_double_lorentz, calculate_exact_circle, fit_vipa, VIPA, \
-    are_points_on_line, fit_quadruple_lorentz
+    are_points_on_line, fit_quadruple_lorentz, _lorentz_error, \
+    _lorentz_error_jacobian
 
 from bmlab.models.setup import AVAILABLE_SETUPS
 
@@ -28,6 +29,31 @@ def test_fit_lorentz():
     np.testing.assert_almost_equal(actual_offset, offset, decimal=3)
 
 
+@pytest.mark.parametrize('params', [
+    # (w0, fwhm, intensity) for every peak, followed by the offset
+    [15., 4., 10., 2.],
+    [10., 4., 10., 20., 3., 8., 2.],
+    [5., 4., 10., 12., 3., 8., 19., 2., 6., 25., 5., 9., 2.],
+])
+def test_lorentz_error_jacobian(params):
+    x = np.linspace(0, 30, 100)
+    # Data that does not match the parameters,
+    # so the residuals are not zero
+    y = lorentz(x, 14., 5., 12.) + 1. + np.sin(x)
+    params = np.array(params)
+    step = 1e-6
+
+    jacobian = _lorentz_error_jacobian(params, x, y)
+    assert jacobian.shape == (len(x), len(params))
+    for idx in range(len(params)):
+        delta = np.zeros(len(params))
+        delta[idx] = step
+        expected = (_lorentz_error(params + delta, x, y) -
+                    _lorentz_error(params - delta, x, y)) / (2 * step)
+        np.testing.assert_allclose(
+            jacobian[:, idx], expected, rtol=1e-5, atol=1e-5)
+
+
 def test_fit_lorentz_real_image_data():
     """ The data for this test case has been extracted manually
         from the running BMicro application.
@@ -137,7 +163,7 @@ def test_fit_double_lorentz_with_bounds():
     y_data = lorentz(x, w0_left, fwhm_left, intensity_left)
     y_data += lorentz(x, w0_right, fwhm_right, intensity_right) + offset
 
-    bounds_w0 = ((19, 19.9), (-np.Inf, np.Inf))
+    bounds_w0 = ((19, 19.9), (-np.inf, np.inf))
 
     w0s, fwhms, intens, actual_offset \
         = fit_double_lorentz(x, y_data, bounds_w0)
@@ -152,7 +178,7 @@ def test_fit_double_lorentz_with_bounds():
 
     np.testing.assert_almost_equal(actual_offset, offset, decimal=1)
 
-    bounds_w0 = ((-np.Inf, np.Inf), (20.1, 21))
+    bounds_w0 = ((-np.inf, np.inf), (20.1, 21))
 
     w0s, fwhms, intens, actual_offset \
         = fit_double_lorentz(x, y_data, bounds_w0)
@@ -167,8 +193,8 @@ def test_fit_double_lorentz_with_bounds():
 
     np.testing.assert_almost_equal(actual_offset, offset, decimal=1)
 
-    bounds_w0 = ((20.1, 21), (-np.Inf, np.Inf))
-    bounds_fwhm = ((-np.Inf, np.Inf), (5.1, np.Inf))
+    bounds_w0 = ((20.1, 21), (-np.inf, np.inf))
+    bounds_fwhm = ((-np.inf, np.inf), (5.1, np.inf))
 
     w0s, fwhms, intens, actual_offset \
         = fit_double_lorentz(x, y_data,
@@ -184,7 +210,7 @@ def test_fit_double_lorentz_with_bounds():
 
     np.testing.assert_almost_equal(actual_offset, offset, decimal=1)
 
-    bounds_fwhm = ((-np.Inf, np.Inf), (5.1, np.Inf))
+    bounds_fwhm = ((-np.inf, np.inf), (5.1, np.inf))
 
     w0s, fwhms, intens, actual_offset \
         = fit_double_lorentz(x, y_data,
@@ -230,15 +256,15 @@ def test_fit_quadruple_lorentz_with_bounds():
 
     bounds_w0 = (
         (10.1, 11),
-        (-np.Inf, np.Inf),
+        (-np.inf, np.inf),
         (29.0, 29.9),
-        (-np.Inf, np.Inf)
+        (-np.inf, np.inf)
     )
     bounds_fwhm = (
-        (-np.Inf, np.Inf),
-        (4.1, np.Inf),
-        (-np.Inf, np.Inf),
-        (-np.Inf, np.Inf)
+        (-np.inf, np.inf),
+        (4.1, np.inf),
+        (-np.inf, np.inf),
+        (-np.inf, np.inf)
     )
 
     w0s, fwhms, intens, actual_offset\
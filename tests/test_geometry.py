@@ -15,9 +15,18 @@ def test_intersect_circle_rectangle():
     rect = Rectangle((1, 1))
     actual = circle.intersection(rect)
 
-    cut = 0.72955
+    cut = np.sqrt(3) - 1
     expected = [(0, cut), (cut, 0)]
-    np.testing.assert_array_almost_equal(actual, expected, decimal=5)
+    np.testing.assert_array_almost_equal(actual, expected, decimal=12)
+
+    # Both intersections on the same edge
+    circle = Circle((-3, 5), 5)
+    rect = Rectangle((10, 10))
+    actual = circle.intersection(rect)
+    np.testing.assert_array_almost_equal(actual, [(0, 1), (0, 9)])
+
+    # No intersection if the circle is inside the rectangle
+    assert Circle((5, 5), 2).intersection(rect) == []
 
 
 def test_circle_angle():
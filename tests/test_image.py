@@ -2,9 +2,12 @@ import pathlib
 
 import numpy as np
 import pytest
+from scipy.signal import medfilt2d
+from skimage.morphology import closing, disk
 
 from bmlab.image import set_orientation, find_max_in_radius
-from bmlab.image import extract_lines_along_arc
+from bmlab.image import extract_lines_along_arc, binary_closing, \
+    median_filter_3x3
 from bmlab.geometry import Circle
 
 
@@ -65,6 +68,27 @@ def test_find_max_in_radius():
     actual = find_max_in_radius(img, expected, 15)
     assert actual == expected
 
+    # The circle may extend beyond the image
+    img[98, 1] = 2
+    actual = find_max_in_radius(img, (95.5, 3.2), 10)
+    assert actual == (98, 1)
+
+
+def test_median_filter_3x3():
+    rng = np.random.default_rng(42)
+    img = rng.integers(0, 20, (50, 40)).astype(float)
+    np.testing.assert_array_equal(median_filter_3x3(img), medfilt2d(img))
+
+
+def test_binary_closing():
+    rng = np.random.default_rng(42)
+    img = rng.random((120, 90)) > 0.9
+    for radius in [1, 2.5, 5, 10]:
+        np.testing.assert_array_equal(
+            binary_closing(img, disk(radius)),
+            closing(img, disk(radius))
+        )
+
 
 def test_extract_lines_along_arc():
 
@@ -95,3 +119,16 @@ def test_extract_lines_along_arc():
 
     # Quadratic scaling should shift the sum to the outside
     assert np.all(actual_2 > actual)
+
+
+def test_extract_lines_along_arc_stack():
+    rng = np.random.default_rng(42)
+    imgs = rng.random((3, 50, 60))
+    arc = rng.random((20, 5, 2)) * 70 - 5
+
+    actual = extract_lines_along_arc(imgs, arc)
+
+    assert actual.shape == (3, 20)
+    for img, values in zip(imgs, actual):
+        np.testing.assert_array_equal(
+            values, extract_lines_along_arc(img, arc))
@@ -1,8 +1,9 @@
 import pathlib
+from types import SimpleNamespace
 
 import numpy as np
 
-from bmlab.controllers import Controller
+from bmlab.controllers import Controller, EvaluationController
 from bmlab.models import Orientation
 from bmlab.models.setup import AVAILABLE_SETUPS
 
@@ -36,3 +37,34 @@ def test_run_pipeline():
     shift = evm.results['brillouin_shift_f']
     assert shift.size != 0
     np.testing.assert_allclose(shift, 5.03e9, atol=50E6)
+
+
+class AbortAfter(object):
+    """ Abort flag that is set after the given number of checks """
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    @property
+    def value(self):
+        self.checks -= 1
+        return self.checks < 0
+
+
+def test_abort_evaluation():
+    run_pipeline()
+
+    # Abort the evaluation after two measurement positions
+    count = SimpleNamespace(value=0)
+    max_count = SimpleNamespace(value=0)
+    EvaluationController().evaluate(
+        abort=AbortAfter(2), count=count, max_count=max_count)
+
+    assert count.value == 2
+    assert max_count.value == -1
+
+    # The positions visited before the abort are still fitted
+    shift = EvaluationController().session.evaluation_model()\
+        .results['brillouin_shift_f']
+    np.testing.assert_allclose(shift[0:2], 5.03e9, atol=50E6)
+    assert np.isnan(shift[2:]).all()
@@ -1,12 +1,11 @@
 from pathlib import Path
-import os
 import shutil
-import uuid
 
 import h5py
 import numpy as np
 import pytest
 
+from bmlab.serializer import Serializer
 from bmlab.session import Session
 from bmlab.models.calibration_model import FitSet, RayleighFit
 from bmlab.models.extraction_model import CircleFit
@@ -14,28 +13,13 @@ from bmlab.controllers import CalibrationController, ExtractionController
 
 
 @pytest.fixture()
-def tmp_dir():
-    tmp_dir = 'tmp' + str(uuid.uuid4())
-    os.mkdir(tmp_dir)
-    os.chdir(tmp_dir)
-    yield tmp_dir
-    os.chdir('..')
-    try:
-        shutil.rmtree(tmp_dir)
-    # Windows sometimes does not correctly close the HDF file. Then we have a
-    # file access conflict.
-    except Exception as e:
-        print(e)
-
-
-@pytest.fixture()
-def session_file(tmp_dir):
+def session_file(tmp_path):
 
     session = Session.get_instance()
 
-    shutil.copy(data_file_path('Water.h5'), Path.cwd() / 'Water.h5')
+    shutil.copy(data_file_path('Water.h5'), tmp_path / 'Water.h5')
 
-    session.set_file('Water.h5')
+    session.set_file(tmp_path / 'Water.h5')
 
     session.set_reflection(vertically=True, horizontally=False)
 
@@ -64,19 +48,19 @@ def session_file(tmp_dir):
 
     session.clear()
 
-    yield 'Water.session.h5'
+    yield tmp_path / 'Water.session.h5'
 
 
 def data_file_path(file_name):
     return Path(__file__).parent / 'data' / file_name
 
 
-def test_serialize_session(tmp_dir):
+def test_serialize_session(tmp_path):
     session = Session.get_instance()
 
-    shutil.copy(data_file_path('Water.h5'), Path.cwd() / 'Water.h5')
+    shutil.copy(data_file_path('Water.h5'), tmp_path / 'Water.h5')
 
-    session.set_file('Water.h5')
+    session.set_file(tmp_path / 'Water.h5')
 
     session.set_reflection(vertically=True, horizontally=False)
 
@@ -100,7 +84,7 @@ def test_serialize_session(tmp_dir):
 
     session.save()
 
-    with h5py.File('Water.session.h5', 'r') as f:
+    with h5py.File(tmp_path / 'Water.session.h5', 'r') as f:
         assert 'session/extraction_models/0/points/1' in f
         assert f.attrs['version'].startswith('bmlab')
 
@@ -110,7 +94,7 @@ def test_serialize_session(tmp_dir):
 def test_deserialize_session_file(session_file):
 
     session = Session.get_instance()
-    session.set_file('Water.h5')
+    session.set_file(session_file)
 
     em = session.extraction_model()
     cm = session.calibration_model()
@@ -123,16 +107,16 @@ def test_deserialize_session_file(session_file):
     session.clear()
 
 
-def test_serialize_fitset(tmp_dir):
+def test_serialize_fitset(tmp_path):
 
     fit_set = FitSet()
     fit = RayleighFit('1', 3, 4, 11., 12., 13., 14.)
     fit_set.add_fit(fit)
 
-    with h5py.File('tmpsession.h5', 'w') as f:
+    with h5py.File(tmp_path / 'tmpsession.h5', 'w') as f:
         fit_set.serialize(f, 'fits')
 
-    with h5py.File('tmpsession.h5', 'r') as f:
+    with h5py.File(tmp_path / 'tmpsession.h5', 'r') as f:
         actual = FitSet.deserialize(f['fits'])
 
     actual_fit = actual.get_fit('1', 3, 4)
@@ -143,19 +127,35 @@ def test_serialize_fitset(tmp_dir):
     assert actual_fit.offset == expected_fit.offset
 
 
-def test_de_serialize_CircleFit(tmp_dir):
+def test_de_serialize_CircleFit(tmp_path):
 
     cf = CircleFit(center=(1., 2.), radius=3.)
 
-    with h5py.File(str(tmp_dir) + 'abc.h5', 'w') as f:
+    with h5py.File(tmp_path / 'abc.h5', 'w') as f:
         cf.serialize(f, 'circle')
 
         assert isinstance(f['circle'], h5py.Group)
         assert f['circle'].attrs['type'] == \
                'bmlab.models.extraction_model.CircleFit'
 
-    with h5py.File(str(tmp_dir) + 'abc.h5', 'r') as f:
+    with h5py.File(tmp_path / 'abc.h5', 'r') as f:
         cf = CircleFit.deserialize(f['circle'])
 
         np.testing.assert_array_equal(cf.center, (1., 2.))
         assert cf.radius == 3.
+
+
+def test_serialize_large_array(tmp_path):
+    array = np.full((50, 50, 2), np.nan)
+    array[..., 0] = np.arange(2500).reshape(50, 50)
+
+    with h5py.File(tmp_path / 'array.h5', 'w') as f:
+        Serializer().serialize_array(f, array, 'large')
+        Serializer().serialize_array(f, array[0, 0], 'small')
+
+    with h5py.File(tmp_path / 'array.h5', 'r') as f:
+        # Large arrays are compressed with a filter every HDF5 build has
+        assert f['large'].compression == 'gzip'
+        assert f['small'].compression is None
+        np.testing.assert_array_equal(f['large'][...], array)
+        np.testing.assert_array_equal(f['small'][...], array[0, 0])
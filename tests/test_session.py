@@ -135,3 +135,29 @@ def test_session_get_image_keys():
            ['0', '3', '6', '9', '12',
             '1', '4', '7', '10', '13',
             '2', '5', '8', '11', '14']
+
+
+def test_set_file_closes_previous_file():
+    session = Session.get_instance()
+    session.set_file(data_file_path('Water.h5'))
+    previous_file = session.file
+
+    session.set_file(data_file_path('2D-xy.h5'))
+
+    assert not previous_file.file
+    assert session.file.path == data_file_path('2D-xy.h5')
+
+
+def test_clear_session_shuts_down_pool():
+    session = Session.get_instance()
+    pool = session.get_pool()
+
+    assert session.get_pool_size() >= 1
+    assert session.get_pool() is pool
+
+    session.clear()
+
+    assert session._pool is None
+    # The pool does not accept new work after the shutdown
+    with pytest.raises(RuntimeError):
+        pool.submit(abs, -1)
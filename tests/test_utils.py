@@ -0,0 +1,54 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from bmlab.utils import nanmean
+
+
+def make_array(dtype, with_nans=False):
+    a = np.arange(2 * 3 * 4).reshape(2, 3, 4).astype(dtype) * 1.7
+    if with_nans:
+        a[0, 1, 2] = np.nan
+        # A slice with only NaNs
+        a[1, :, 3] = np.nan
+    return a
+
+
+def assert_same_as_numpy(a, axis):
+    with warnings.catch_warnings():
+        # Slices with only NaNs give a RuntimeWarning
+        warnings.simplefilter('ignore', RuntimeWarning)
+        expected = np.nanmean(a, axis=axis)
+        actual = nanmean(a, axis=axis)
+
+    assert type(actual) is type(expected)
+    assert np.shape(actual) == np.shape(expected)
+    assert actual.dtype == expected.dtype
+    np.testing.assert_allclose(actual, expected, rtol=1e-6)
+
+
+@pytest.mark.parametrize('axis', [None, 1, (1, 2)])
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_nanmean_float(dtype, axis):
+    assert_same_as_numpy(make_array(dtype), axis)
+
+
+@pytest.mark.parametrize('axis', [None, 1, (1, 2)])
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_nanmean_float_with_nans(dtype, axis):
+    assert_same_as_numpy(make_array(dtype, with_nans=True), axis)
+
+
+@pytest.mark.parametrize('axis', [None, 1, (1, 2)])
+@pytest.mark.parametrize('dtype', [np.uint16, np.int64])
+def test_nanmean_integer(dtype, axis):
+    assert_same_as_numpy(make_array(dtype), axis)
+
+
+def test_nanmean_empty():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        assert np.isnan(nanmean(np.empty((0, 3))))
+        np.testing.assert_array_equal(
+            nanmean(np.empty((0, 3)), axis=0), np.full(3, np.nan))